@@ -4,7 +4,7 @@ from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.x509.oid import NameOID
 from cryptography import x509
 from datetime import datetime, timedelta, timezone
-from certsim.key_management import load_private_key
+from certsim.key_management import load_private_key, find_private_key_path
 from certsim.utils import console, get_user_folder, get_default_user_name
 
 @click.command()
@@ -12,10 +12,10 @@ def create_certificate():
     """📝 Cria um certificado digital X.509 com informações específicas."""
     user_name = get_default_user_name()  # Usa o nome da máquina como nome do usuário
     folder_path = get_user_folder(user_name)
-    private_key_path = os.path.join(folder_path, "chave_privada.pem")
+    private_key_path = find_private_key_path(folder_path)
     
-    if not os.path.exists(private_key_path):
-        console.print("[red]❌ Arquivo 'chave_privada.pem' não encontrado. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
+    if private_key_path is None:
+        console.print("[red]❌ Chave privada não encontrada. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
         return
     
     # Solicitar informações do usuário com valores padrão
@@ -1,47 +1,185 @@
 import os
+import time
 import click
-from cryptography.hazmat.primitives import serialization
+from asn1crypto import algos, keys, pem
+from cryptography.hazmat.primitives import serialization, hashes, padding
 from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from certsim.utils import console, get_user_folder, get_default_user_name
 
+PRIVATE_KEY_PEM = "chave_privada.pem"
+PRIVATE_KEY_DER = "chave_privada.der"
+
+# Parâmetros padrão do PBKDF2 usados na cifragem PKCS#8 (PBES2 + AES-256-CBC)
+DEFAULT_KDF_ITERATIONS = 600_000
+KDF_HASHES = {"sha256": hashes.SHA256, "sha512": hashes.SHA512}
+
+# Tempo padrão (em segundos) que uma chave decifrada permanece no cache do processo,
+# sobrescrito pela variável de ambiente CERTSIM_KEY_CACHE_TTL
+DEFAULT_KEY_CACHE_TTL = 300.0
+
+# Cache em memória: caminho -> (mtime_ns, instante do carregamento, chave)
+_key_cache = {}
+
+
+def _encrypt_pkcs8(private_key, password, iterations, kdf_hash):
+    """Serializa a chave em PKCS#8 cifrado (PBES2) com parâmetros de KDF explícitos."""
+    der = private_key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    salt = os.urandom(16)
+    iv = os.urandom(16)
+    kdf = PBKDF2HMAC(algorithm=KDF_HASHES[kdf_hash](), length=32, salt=salt, iterations=iterations)
+    padder = padding.PKCS7(128).padder()
+    encryptor = Cipher(algorithms.AES(kdf.derive(password)), modes.CBC(iv)).encryptor()
+    encrypted_data = encryptor.update(padder.update(der) + padder.finalize()) + encryptor.finalize()
+
+    encrypted_info = keys.EncryptedPrivateKeyInfo({
+        'encryption_algorithm': algos.EncryptionAlgorithm({
+            'algorithm': 'pbes2',
+            'parameters': algos.Pbes2Params({
+                'key_derivation_func': algos.KdfAlgorithm({
+                    'algorithm': 'pbkdf2',
+                    'parameters': algos.Pbkdf2Params({
+                        'salt': algos.Pbkdf2Salt(name='specified', value=salt),
+                        'iteration_count': iterations,
+                        'key_length': 32,
+                        'prf': algos.HmacAlgorithm({'algorithm': kdf_hash}),
+                    }),
+                }),
+                'encryption_scheme': algos.EncryptionAlgorithm({
+                    'algorithm': 'aes256_cbc',
+                    'parameters': iv,
+                }),
+            }),
+        }),
+        'encrypted_data': encrypted_data,
+    })
+    return pem.armor('ENCRYPTED PRIVATE KEY', encrypted_info.dump())
+
+
+def _get_key_cache_ttl():
+    """Lê o TTL do cache de CERTSIM_KEY_CACHE_TTL, usando o padrão se o valor for inválido."""
+    value = os.getenv("CERTSIM_KEY_CACHE_TTL")
+    if value is None:
+        return DEFAULT_KEY_CACHE_TTL
+    try:
+        ttl = float(value)
+        if ttl < 0:
+            raise ValueError
+        return ttl
+    except ValueError:
+        console.print(f"[yellow]⚠️ Valor inválido em CERTSIM_KEY_CACHE_TTL ({value!r}); usando {DEFAULT_KEY_CACHE_TTL:g} segundos.[/]")
+        return DEFAULT_KEY_CACHE_TTL
+
+
+def _write_private_file(path, data):
+    """Grava o arquivo da chave privada com permissão restrita ao dono."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # O modo do os.open só vale na criação; corrige arquivos já existentes
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+def find_private_key_path(folder_path):
+    """Retorna o caminho da chave privada (PEM ou DER) existente na pasta, ou None."""
+    for file_name in (PRIVATE_KEY_PEM, PRIVATE_KEY_DER):
+        path = os.path.join(folder_path, file_name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def clear_key_cache():
+    """Descarta todas as chaves privadas mantidas no cache do processo."""
+    _key_cache.clear()
+
+
 @click.command()
-def generate_keys():
+@click.option("--format", "key_format", type=click.Choice(["pkcs8", "traditional", "der"]), default="pkcs8",
+              show_default=True, help="Formato da chave privada. 'der' grava a chave sem criptografia.")
+@click.option("--kdf-iterations", type=click.IntRange(min=1000), default=DEFAULT_KDF_ITERATIONS,
+              show_default=True, help="Iterações do PBKDF2 (apenas pkcs8).")
+@click.option("--kdf-hash", type=click.Choice(list(KDF_HASHES)), default="sha256",
+              show_default=True, help="Função hash do PBKDF2 (apenas pkcs8).")
+def generate_keys(key_format, kdf_iterations, kdf_hash):
     """🔑 Gera um par de chaves RSA e salva as chaves privada e pública na pasta do usuário."""
     user_name = get_default_user_name()
     folder_path = get_user_folder(user_name)
     console.print(f"🔧 Gerando chaves para {user_name}...")
 
     private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
-    private_key_path = os.path.join(folder_path, "chave_privada.pem")
     public_key_path = os.path.join(folder_path, "chave_publica.pem")
 
-    password = click.prompt("🔐 Insira uma senha para criptografar a chave privada", hide_input=True, confirmation_prompt=True)
-    
-    with open(private_key_path, "wb") as f:
-        f.write(private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.BestAvailableEncryption(password.encode())
-        ))
+    if key_format == "der":
+        console.print("[yellow]⚠️ A chave privada será salva sem criptografia; mantenha-a em um local protegido pelo sistema.[/]")
+        private_key_path = os.path.join(folder_path, PRIVATE_KEY_DER)
+        private_bytes = private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+    else:
+        private_key_path = os.path.join(folder_path, PRIVATE_KEY_PEM)
+        password = click.prompt("🔐 Insira uma senha para criptografar a chave privada", hide_input=True, confirmation_prompt=True)
+        if key_format == "pkcs8":
+            private_bytes = _encrypt_pkcs8(private_key, password.encode(), kdf_iterations, kdf_hash)
+        else:
+            private_bytes = private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.BestAvailableEncryption(password.encode())
+            )
+
+    _write_private_file(private_key_path, private_bytes)
+
+    # Só após gravar a nova chave remove a do outro formato, para que apenas ela seja encontrada
+    for stale_path in (os.path.join(folder_path, PRIVATE_KEY_PEM), os.path.join(folder_path, PRIVATE_KEY_DER)):
+        _key_cache.pop(stale_path, None)
+        if stale_path != private_key_path and os.path.exists(stale_path):
+            os.remove(stale_path)
 
     with open(public_key_path, "wb") as f:
         f.write(private_key.public_key().public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         ))
-    
+
     console.print(f"[green]✔️ Chave privada e pública geradas e salvas em {folder_path}.")
 
-def load_private_key(folder_path):
-    """Carrega a chave privada do arquivo."""
-    password = click.prompt("🔐 Insira a senha para desbloquear a chave privada", hide_input=True)
-    private_key_path = os.path.join(folder_path, "chave_privada.pem")
+def load_private_key(folder_path, ttl=None):
+    """Carrega a chave privada do arquivo, reutilizando a versão decifrada em cache enquanto válida."""
+    ttl = _get_key_cache_ttl() if ttl is None else ttl
+    private_key_path = find_private_key_path(folder_path)
+    if private_key_path is None:
+        console.print("[red]❌ Falha ao carregar a chave privada: arquivo não encontrado.")
+        return None
+
     try:
+        mtime = os.stat(private_key_path).st_mtime_ns
+        cached = _key_cache.get(private_key_path)
+        if cached is not None:
+            cached_mtime, loaded_at, private_key = cached
+            if cached_mtime == mtime and time.monotonic() - loaded_at < ttl:
+                console.print("[green]🔓 Chave privada carregada do cache.[/]")
+                return private_key
+            del _key_cache[private_key_path]
+
         with open(private_key_path, "rb") as f:
-            private_key = serialization.load_pem_private_key(
-                f.read(),
-                password=password.encode()
-            )
+            data = f.read()
+        if private_key_path.endswith(".der"):
+            private_key = serialization.load_der_private_key(data, password=None)
+        else:
+            password = click.prompt("🔐 Insira a senha para desbloquear a chave privada", hide_input=True)
+            private_key = serialization.load_pem_private_key(data, password=password.encode())
+
+        if ttl > 0:
+            _key_cache[private_key_path] = (mtime, time.monotonic(), private_key)
         console.print("[green]🔓 Chave privada carregada com sucesso.[/]")
         return private_key
     except Exception as e:
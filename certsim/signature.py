@@ -4,7 +4,7 @@ from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.serialization import pkcs7, Encoding
 from cryptography.hazmat.primitives.serialization.pkcs7 import PKCS7Options
-from certsim.key_management import load_private_key
+from certsim.key_management import load_private_key, find_private_key_path
 from certsim.utils import console, get_user_folder, get_default_user_name
 from cryptography import x509
 from cryptography.x509.oid import NameOID
@@ -21,11 +21,11 @@ def sign_document():
     """✍️ Assina digitalmente um documento usando a chave privada e anexa o certificado."""
     user_name = get_default_user_name()
     folder_path = get_user_folder(user_name)
-    private_key_path = os.path.join(folder_path, "chave_privada.pem")
+    private_key_path = find_private_key_path(folder_path)
     cert_path = os.path.join(folder_path, "certificado.pem")
 
-    if not os.path.exists(private_key_path):
-        console.print("[red]❌ Arquivo 'chave_privada.pem' não encontrado. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
+    if private_key_path is None:
+        console.print("[red]❌ Chave privada não encontrada. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
         return
 
     if not os.path.exists(cert_path):
@@ -105,11 +105,11 @@ def sign_document_with_pkcs7():
     """✍️ Assina digitalmente um documento e empacota em PKCS#7."""
     user_name = get_default_user_name()
     folder_path = get_user_folder(user_name)
-    private_key_path = os.path.join(folder_path, "chave_privada.pem")
+    private_key_path = find_private_key_path(folder_path)
     cert_path = os.path.join(folder_path, "certificado.pem")
 
-    if not os.path.exists(private_key_path):
-        console.print("[red]❌ Arquivo 'chave_privada.pem' não encontrado. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
+    if private_key_path is None:
+        console.print("[red]❌ Chave privada não encontrada. Por favor, gere a chave privada primeiro usando 'generate_keys'.[/]")
         return
 
     if not os.path.exists(cert_path):
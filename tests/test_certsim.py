@@ -4,6 +4,8 @@ import logging
 from unittest.mock import patch
 from click.testing import CliRunner
 from certsim.cli import certsim
+from certsim.key_management import load_private_key, clear_key_cache
+from asn1crypto import keys, pem
 from rich.console import Console
 from time import sleep
 
@@ -26,6 +28,7 @@ MACHINE_NAME = get_machine_name()
 
 # Caminhos para arquivos gerados durante os testes
 PRIVATE_KEY_PATH = os.path.join(MACHINE_NAME, "chave_privada.pem")
+PRIVATE_KEY_DER_PATH = os.path.join(MACHINE_NAME, "chave_privada.der")
 CERTIFICATE_PATH = os.path.join(MACHINE_NAME, "certificado.pem")
 SIGNATURE_PATH = os.path.join(MACHINE_NAME, "assinatura_digital.txt")
 DOCUMENT_PATH = os.path.join(MACHINE_NAME, "test_document.txt")
@@ -38,7 +41,8 @@ def setup_and_teardown():
     yield
     # Teardown: Remover arquivos gerados após os testes
     console.print("🧹 [cyan]Teardown: Removendo arquivos gerados durante o teste.[/]")
-    for path in [PRIVATE_KEY_PATH, CERTIFICATE_PATH, SIGNATURE_PATH, DOCUMENT_PATH, CERT_ASSINATURA_PATH]:
+    clear_key_cache()
+    for path in [PRIVATE_KEY_PATH, PRIVATE_KEY_DER_PATH, CERTIFICATE_PATH, SIGNATURE_PATH, DOCUMENT_PATH, CERT_ASSINATURA_PATH]:
         if os.path.exists(path):
             os.remove(path)
 
@@ -144,3 +148,104 @@ def test_full_sequence():
     sign_document(runner)
     verify_signature(runner)
     verify_signature_failure(runner)
+
+
+def test_pkcs8_kdf_and_key_cache():
+    """Gera chave PKCS#8 com KDF explícito e verifica que a senha é pedida apenas uma vez."""
+    runner = CliRunner()
+    result = runner.invoke(certsim, ['generate-keys', '--format', 'pkcs8', '--kdf-iterations', '1000', '--kdf-hash', 'sha512'],
+                           input='password\npassword\n')
+    assert result.exit_code == 0, "❌ [red]Erro na geração de chaves PKCS#8.[/]"
+    with open(PRIVATE_KEY_PATH, "rb") as f:
+        pem_type, _, der_bytes = pem.unarmor(f.read())
+    assert pem_type == "ENCRYPTED PRIVATE KEY"
+    encryption_algorithm = keys.EncryptedPrivateKeyInfo.load(der_bytes)['encryption_algorithm']
+    kdf_params = encryption_algorithm['parameters']['key_derivation_func']['parameters']
+    assert kdf_params['iteration_count'].native == 1000, "❌ [red]As iterações do KDF não foram aplicadas.[/]"
+    assert kdf_params['prf']['algorithm'].native == 'sha512', "❌ [red]O hash do KDF não foi aplicado.[/]"
+    assert encryption_algorithm['parameters']['encryption_scheme']['algorithm'].native == 'aes256_cbc'
+
+    folder_path = os.path.abspath(MACHINE_NAME)
+    with patch('certsim.key_management.click.prompt', return_value='password') as prompt:
+        first = load_private_key(folder_path)
+        second = load_private_key(folder_path)
+    assert first is not None and first is second, "❌ [red]A chave não foi reutilizada do cache.[/]"
+    assert prompt.call_count == 1, "❌ [red]A senha foi solicitada mais de uma vez.[/]"
+
+    # Uma nova geração de chaves invalida o cache
+    result = runner.invoke(certsim, ['generate-keys', '--format', 'pkcs8', '--kdf-iterations', '1000'],
+                           input='password\npassword\n')
+    assert result.exit_code == 0
+    with patch('certsim.key_management.click.prompt', return_value='password') as prompt:
+        third = load_private_key(folder_path)
+    assert third is not None and third is not first
+    assert prompt.call_count == 1
+
+
+def test_unencrypted_der_key():
+    """Gera chave DER sem criptografia e carrega sem solicitar senha."""
+    runner = CliRunner()
+    result = runner.invoke(certsim, ['generate-keys', '--format', 'der'])
+    assert result.exit_code == 0, "❌ [red]Erro na geração de chave DER.[/]"
+    assert os.path.exists(PRIVATE_KEY_DER_PATH) and not os.path.exists(PRIVATE_KEY_PATH)
+
+    # Regerar sobre um arquivo com permissões amplas deve restringi-las ao dono
+    if os.name != 'nt':
+        os.chmod(PRIVATE_KEY_DER_PATH, 0o644)
+        result = runner.invoke(certsim, ['generate-keys', '--format', 'der'])
+        assert result.exit_code == 0
+        assert os.stat(PRIVATE_KEY_DER_PATH).st_mode & 0o777 == 0o600
+
+    with patch('certsim.key_management.click.prompt') as prompt:
+        private_key = load_private_key(os.path.abspath(MACHINE_NAME), ttl=0)
+    assert private_key is not None, "❌ [red]Falha ao carregar a chave DER.[/]"
+    prompt.assert_not_called()
+
+
+def test_key_cache_invalidated_by_mtime():
+    """Uma alteração na data de modificação do arquivo força a chave a ser decifrada novamente."""
+    runner = CliRunner()
+    result = runner.invoke(certsim, ['generate-keys', '--kdf-iterations', '1000'], input='password\npassword\n')
+    assert result.exit_code == 0
+
+    folder_path = os.path.abspath(MACHINE_NAME)
+    with patch('certsim.key_management.click.prompt', return_value='password') as prompt:
+        first = load_private_key(folder_path)
+        stat = os.stat(PRIVATE_KEY_PATH)
+        os.utime(PRIVATE_KEY_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = load_private_key(folder_path)
+    assert first is not None and second is not None and first is not second
+    assert prompt.call_count == 2, "❌ [red]O cache não foi invalidado pela alteração do arquivo.[/]"
+
+
+def test_key_cache_expires_after_ttl():
+    """Após o TTL expirar, a chave é decifrada novamente."""
+    runner = CliRunner()
+    result = runner.invoke(certsim, ['generate-keys', '--kdf-iterations', '1000'], input='password\npassword\n')
+    assert result.exit_code == 0
+
+    folder_path = os.path.abspath(MACHINE_NAME)
+    with patch('certsim.key_management.click.prompt', return_value='password') as prompt, \
+            patch('certsim.key_management.time.monotonic', side_effect=[100.0, 105.0, 111.0, 111.0]):
+        first = load_private_key(folder_path, ttl=10)
+        second = load_private_key(folder_path, ttl=10)
+        third = load_private_key(folder_path, ttl=10)
+    assert first is second, "❌ [red]A chave não foi reutilizada dentro do TTL.[/]"
+    assert third is not None and third is not first
+    assert prompt.call_count == 2, "❌ [red]A chave não foi decifrada novamente após o TTL.[/]"
+
+
+def test_invalid_cache_ttl_env_falls_back(monkeypatch):
+    """Um valor inválido em CERTSIM_KEY_CACHE_TTL gera aviso e usa o TTL padrão."""
+    runner = CliRunner()
+    result = runner.invoke(certsim, ['generate-keys', '--kdf-iterations', '1000'], input='password\npassword\n')
+    assert result.exit_code == 0
+
+    monkeypatch.setenv("CERTSIM_KEY_CACHE_TTL", "abc")
+    with patch('certsim.key_management.click.prompt', return_value='password') as prompt, \
+            patch('certsim.key_management.console.print') as console_print:
+        first = load_private_key(os.path.abspath(MACHINE_NAME))
+        second = load_private_key(os.path.abspath(MACHINE_NAME))
+    assert first is not None and first is second
+    assert prompt.call_count == 1
+    assert any("CERTSIM_KEY_CACHE_TTL" in str(call.args[0]) for call in console_print.call_args_list)